@@ -1,12 +1,17 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
-import requests
+import plotly.graph_objects as go
+import httpx
+import orjson
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-import seaborn as sns
+from pathlib import Path
 import io
 import os
+import tempfile
 
 # === CONFIGURATION ===
 st.set_page_config(page_title="SolarEdge Dashboard", layout="wide")
@@ -20,38 +25,156 @@ if not API_KEY or not SITE_ID:
     st.warning("Please enter your API Key and Site ID in the sidebar to begin.")
     st.stop()
 
+# The site ID is used in URLs and cache paths, so only plain digits are accepted
+if not (SITE_ID.isascii() and SITE_ID.isdigit()):
+    st.warning("Site ID must be numeric.")
+    st.stop()
+
 BASE_URL = f"https://monitoringapi.solaredge.com/site/{SITE_ID}"
-MAX_DAYS = 31
+MAX_CONCURRENCY = 3  # SolarEdge allows 3 concurrent API calls per source IP
+HTTP_LIMITS = httpx.Limits(max_connections=16, max_keepalive_connections=16)
+CACHE_DIR = Path(".cache")
+CACHE_SETTLE_DAYS = 2  # months are persisted only once they ended this many days ago
+MAX_RETRIES = 3  # retries of the same range on 429/5xx before giving up on it
+AUTH_ERRORS = (401, 403)
+WH_PER_QH_TO_W = 4.0  # a 15-minute Wh reading times 4 is its average W
+
+# Shared HTTP/2 client so one-off requests reuse pooled TCP/TLS connections.
+# Streamlit re-executes the script on every rerun, so it is created once via
+# cache_resource rather than at module level.
+@st.cache_resource
+def get_client():
+    return httpx.Client(http2=True, limits=HTTP_LIMITS, timeout=30)
+
+SESSION = get_client()
 
 @st.cache_data(show_spinner=False)
-def fetch_energy_chunked(time_unit, start_date, end_date):
-    current = start_date
-    all_frames = []
+def fetch_energy_chunked(time_unit, start_date, end_date, site_id, api_key):
+    # site_id and api_key key the in-memory cache, which is shared across
+    # sessions; the request itself goes through BASE_URL/API_KEY
+    if start_date > end_date:
+        return pd.DataFrame()
 
+    # One chunk per calendar month, which stays within the API's 31-day limit
+    ranges = []
+    current = start_date.replace(day=1)
     while current <= end_date:
-        chunk_end = min(current + timedelta(days=MAX_DAYS - 1), end_date)
-        try:
-            df = fetch_single_chunk(time_unit, current, chunk_end)
-            if not df.empty:
-                all_frames.append(df)
-            current = chunk_end + timedelta(days=1)
-
-        except requests.exceptions.HTTPError as e:
-            st.warning(f"⚠️ Failed {current} to {chunk_end}. Retrying day-by-day...")
-            for d in pd.date_range(current, chunk_end):
-                try:
-                    df_day = fetch_single_chunk(time_unit, d.date(), d.date())
-                    if not df_day.empty:
-                        all_frames.append(df_day)
-                except Exception as sub_e:
-                    st.warning(f"⚠️ Skipped {d.date()}: {sub_e}")
-            current = chunk_end + timedelta(days=1)
+        next_month = (current + timedelta(days=32)).replace(day=1)
+        ranges.append((current, next_month - timedelta(days=1)))
+        current = next_month
+
+    results = asyncio.run(fetch_months(time_unit, ranges, start_date, end_date))
+
+    all_frames = []
+    for frames, warnings in results:
+        for msg in warnings:
+            st.warning(msg)
+        all_frames.extend(frames)
 
     if all_frames:
-        return pd.concat(all_frames, ignore_index=True)
+        # Concatenate the raw chunks once, then derive features in a single pass
+        df = add_datetime_features(pd.concat(all_frames, ignore_index=True))
+        # Months read from the disk cache may extend past the requested range
+        days = df["date"].values
+        in_range = (days >= np.datetime64(start_date, "D")) & (days <= np.datetime64(end_date, "D"))
+        return df[in_range].reset_index(drop=True)
     return pd.DataFrame()
 
-def fetch_single_chunk(time_unit, start_date, end_date):
+async def fetch_months(time_unit, ranges, start_date, end_date):
+    # All chunks are multiplexed over one async HTTP/2 client; the semaphore is
+    # taken around each request, so retries and bisection stay within the
+    # API's concurrency limit. Results keep request order.
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    async with httpx.AsyncClient(http2=True, limits=HTTP_LIMITS, timeout=30) as client:
+        # Disk-cached months are only served once the key is confirmed for this
+        # site; otherwise everything goes to the API, which reports the failure
+        use_disk_cache = False
+        cache_paths = [month_cache_path(time_unit, a, b) for a, b in ranges]
+        if any(path is not None and path.exists() for path in cache_paths):
+            try:
+                r = await client.get(f"{BASE_URL}/dataPeriod", params={"api_key": API_KEY}, timeout=30)
+                r.raise_for_status()
+                use_disk_cache = True
+            except httpx.HTTPError:
+                pass
+
+        return await asyncio.gather(*(
+            fetch_month(client, semaphore, time_unit, a, b, start_date, end_date, use_disk_cache)
+            for a, b in ranges
+        ))
+
+def month_cache_path(time_unit, month_start, month_end):
+    # Months still within the upload lag (or in a different timezone than the
+    # server) may be incomplete, so they get no cache file
+    if month_end > datetime.today().date() - timedelta(days=CACHE_SETTLE_DAYS):
+        return None
+    return CACHE_DIR / SITE_ID / time_unit / f"{month_start}_{month_end}.parquet"
+
+async def fetch_month(client, semaphore, time_unit, month_start, month_end, start_date, end_date,
+                      use_disk_cache):
+    # Settled months are persisted as Parquet so they survive restarts; recent
+    # months are always fetched fresh, clipped to the requested range
+    path = month_cache_path(time_unit, month_start, month_end)
+    if path is None:
+        return await fetch_range(client, semaphore, time_unit,
+                                 max(month_start, start_date), min(month_end, end_date))
+    if use_disk_cache and path.exists():
+        return [pd.read_parquet(path)], []
+    frames, warnings = await fetch_range(client, semaphore, time_unit, month_start, month_end)
+    # Months with skipped days are not persisted so they are retried next time
+    if frames and not warnings:
+        # Each writer gets its own temp file so concurrent sessions fetching the
+        # same month never publish a half-written file
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as tmp:
+            pd.concat(frames, ignore_index=True).to_parquet(tmp, compression="zstd", index=False)
+        os.replace(tmp.name, path)
+    return frames, warnings
+
+async def fetch_range(client, semaphore, time_unit, start_date, end_date, warnings=None):
+    # A 4xx on a range is bisected and both halves retried concurrently, so a
+    # single bad day costs O(log n) extra requests instead of one per day.
+    # Rate limits and server errors are already retried in fetch_single_chunk
+    # and are not range problems, so those ranges are skipped as a whole;
+    # auth errors abort the whole fetch.
+    top_level = warnings is None
+    if top_level:
+        warnings = []
+    if start_date > end_date:
+        return [], warnings
+    span = start_date if start_date == end_date else f"{start_date} to {end_date}"
+    try:
+        df = await fetch_single_chunk(client, semaphore, time_unit, start_date, end_date)
+    except httpx.HTTPStatusError as e:
+        status = e.response.status_code
+        if status in AUTH_ERRORS:
+            raise
+        if start_date == end_date or status == 429 or status >= 500:
+            warnings.append(f"⚠️ Skipped {span}: {e}")
+            return [], warnings
+        if top_level:
+            warnings.append(f"⚠️ Failed {start_date} to {end_date}. Retrying in smaller ranges...")
+        mid = start_date + timedelta(days=(end_date - start_date).days // 2)
+        halves = await asyncio.gather(
+            fetch_range(client, semaphore, time_unit, start_date, mid, warnings),
+            fetch_range(client, semaphore, time_unit, mid + timedelta(days=1), end_date, warnings),
+        )
+        return halves[0][0] + halves[1][0], warnings
+    except Exception as e:
+        if start_date == end_date:
+            warnings.append(f"⚠️ Skipped {span}: {e}")
+            return [], warnings
+        raise
+    return ([] if df.empty else [df]), warnings
+
+def retry_delay(response, attempt):
+    # Honour a numeric Retry-After header, otherwise back off exponentially
+    retry_after = response.headers.get("Retry-After", "")
+    if retry_after.isdigit():
+        return min(int(retry_after), 60)
+    return 2 ** attempt
+
+async def fetch_single_chunk(client, semaphore, time_unit, start_date, end_date):
     url = f"{BASE_URL}/energy"
     params = {
         "api_key": API_KEY,
@@ -59,48 +182,136 @@ def fetch_single_chunk(time_unit, start_date, end_date):
         "startDate": start_date.isoformat(),
         "endDate": end_date.isoformat()
     }
-    r = requests.get(url, params=params, timeout=30)
+    for attempt in range(MAX_RETRIES + 1):
+        async with semaphore:
+            r = await client.get(url, params=params, timeout=30)
+        transient = r.status_code == 429 or r.status_code >= 500
+        if not transient or attempt == MAX_RETRIES:
+            break
+        await asyncio.sleep(retry_delay(r, attempt))
     r.raise_for_status()
-    data = r.json().get("energy", {}).get("values", [])
-    df = pd.DataFrame(data)
-    if df.empty:
-        return df
+    data = orjson.loads(r.content).get("energy", {}).get("values", [])
+    if not data:
+        return pd.DataFrame()
+    # Build columns directly rather than via the list-of-records path;
+    # missing readings (null) become 0 in the same pass
+    dates = [d["date"] for d in data]
+    values = np.fromiter((d["value"] or 0.0 for d in data), dtype=np.float32, count=len(data))
+    return pd.DataFrame({"date": dates, "value": values})
+
+def add_datetime_features(df):
     df["datetime"] = pd.to_datetime(df["date"])
-    df["value"] = df["value"].fillna(0)
-    df["hour"] = df["datetime"].dt.hour + df["datetime"].dt.minute / 60
-    df["date"] = df["datetime"].dt.date
-    df["year"] = df["datetime"].dt.year
-    df["month"] = df["datetime"].dt.month
-    df["day"] = df["datetime"].dt.day
-    df["hour_rounded"] = df["hour"].round().astype(int)
+
+    # Derive calendar features straight from the datetime64 array. Only the
+    # columns used downstream are kept, in the narrowest dtype that fits;
+    # month-level grouping works off the date column instead.
+    dt64 = df["datetime"].values.astype("datetime64[ns]")
+    minutes = dt64.astype("datetime64[m]").astype("int64")
+    df["date"] = dt64.astype("datetime64[D]")
+    df["year"] = (dt64.astype("datetime64[Y]").astype("int64") + 1970).astype("int16")
+    df["hour_rounded"] = np.rint((minutes % 1440) / 60.0).astype("int8")
     return df
 
 def fetch_site_overview():
     url = f"{BASE_URL}/overview?api_key={API_KEY}"
-    try:
-        r = requests.get(url, timeout=30)
-        r.raise_for_status()
-        return r.json().get("overview", {})
-    except Exception as e:
-        st.warning(f"Failed to fetch site overview: {e}")
-        return {}
+    r = SESSION.get(url, timeout=30)
+    r.raise_for_status()
+    return orjson.loads(r.content).get("overview", {})
 
 def fetch_env_benefits():
     url = f"{BASE_URL}/envBenefits?api_key={API_KEY}"
+    r = SESSION.get(url, timeout=30)
+    r.raise_for_status()
+    return orjson.loads(r.content).get("envBenefits", {})
+
+def result_or_warn(future, what):
+    # Warnings are raised from the script thread; pool threads have no Streamlit context
     try:
-        r = requests.get(url, timeout=30)
-        r.raise_for_status()
-        return r.json().get("envBenefits", {})
+        return future.result()
     except Exception as e:
-        st.warning(f"Failed to fetch environmental benefits: {e}")
+        st.warning(f"Failed to fetch {what}: {e}")
         return {}
 
+# === AGGREGATIONS ===
+# Keyed on frame length, time span and value total so Streamlit doesn't hash
+# whole frames, while refetches whose readings changed still miss the cache
+FRAME_HASH_FUNCS = {pd.DataFrame: lambda d: (len(d), d["datetime"].iloc[0], d["datetime"].iloc[-1],
+                                             float(d["value"].to_numpy().sum(dtype=np.float64))) if len(d) else 0}
+
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
+def compute_daily_stats(df):
+    # One pass over the raw series; the monthly view is derived from this
+    daily = df.groupby("date", sort=False, observed=True).agg(
+        total=("value", "sum"), peak=("value", "max"), count=("value", "count")).reset_index()
+    # Sorted here since the daily line chart draws points in row order
+    daily = daily.sort_values("date", ignore_index=True)
+    daily["max_power"] = (daily["peak"] * WH_PER_QH_TO_W).round()
+    return daily
+
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
+def compute_avg_hour(df):
+    avg_hour = df.groupby("hour_rounded", sort=False, observed=True)["value"].mean().reset_index()
+    return avg_hour.sort_values("hour_rounded", ignore_index=True)
+
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
+def compute_monthly_power(df):
+    # Average of 15-min readings per month, i.e. summed daily totals over summed counts
+    daily = compute_daily_stats(df)
+    daily["ym"] = daily["date"].values.astype("datetime64[M]")
+    monthly_power = daily.groupby("ym", sort=False, observed=True).agg(
+        total=("total", "sum"), count=("count", "sum"), peak_wh=("peak", "max")).reset_index()
+    monthly_power["avg_wh"] = monthly_power["total"] / monthly_power["count"]
+    monthly_power["avg_w"] = (monthly_power["avg_wh"] * WH_PER_QH_TO_W).round()
+    monthly_power["peak_w"] = (monthly_power["peak_wh"] * WH_PER_QH_TO_W).round()
+    monthly_power["label"] = monthly_power["ym"].dt.strftime("%Y-%m")
+    return monthly_power
+
+def compute_heatmap_pivot(df):
+    # Bucketed mean over an hour x day grid; empty cells stay 0. Returns raw
+    # arrays (grid, hours, days) so callers can rescale without a DataFrame.
+    day_idx, day_labels = pd.factorize(df["date"], sort=True)
+    hour_idx = df["hour_rounded"].to_numpy()
+    n_hours = int(hour_idx.max()) + 1
+    sums = np.zeros((n_hours, day_labels.size), np.float32)
+    counts = np.zeros_like(sums, np.int32)
+    np.add.at(sums, (hour_idx, day_idx), df["value"].to_numpy(np.float32))
+    np.add.at(counts, (hour_idx, day_idx), 1)
+    pivot = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+    keep = pivot.any(axis=1)
+    # date is datetime64[D]; format the labels so ticks don't carry a time part
+    return pivot[keep], np.arange(n_hours)[keep], day_labels.strftime("%Y-%m-%d")
+
+# cache_resource hands back the same dict on every rerun instead of unpickling
+# a copy of every partition; callers treat the frames as read-only
+@st.cache_resource(show_spinner=False, hash_funcs=FRAME_HASH_FUNCS, max_entries=4)
+def partition_by_year(df):
+    return {int(y): g.reset_index(drop=True) for y, g in df.groupby("year", sort=False, observed=True)}
+
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
+def to_csv_bytes(df):
+    buf = io.BytesIO()
+    df.to_csv(buf, index=False)
+    return buf.getvalue()
+
+@st.cache_data(show_spinner=False, hash_funcs=FRAME_HASH_FUNCS)
+def to_parquet_bytes(df):
+    buf = io.BytesIO()
+    df.to_parquet(buf, engine="pyarrow", compression="zstd", index=False)
+    return buf.getvalue()
+
 # === UI ===
+# Overview and environmental benefits are requested concurrently while the
+# page header renders, so the wait is the slower of the two rather than the sum
+executor = ThreadPoolExecutor(max_workers=2)
+overview_future = executor.submit(fetch_site_overview)
+env_future = executor.submit(fetch_env_benefits)
+executor.shutdown(wait=False)
+
 st.title("\U0001F4A1 SolarEdge Production Dashboard")
 
 # Site overview
 st.subheader("System Overview")
-overview = fetch_site_overview()
+overview = result_or_warn(overview_future, "site overview")
 if overview:
     col1, col2, col3 = st.columns(3)
     col1.metric("Current Power (W)", f"{overview.get('currentPower', {}).get('power', 0):,.0f}")
@@ -109,7 +320,7 @@ if overview:
 
 # Environmental impact
 st.subheader("Environmental Impact")
-env = fetch_env_benefits()
+env = result_or_warn(env_future, "environmental benefits")
 co2 = env.get('gasEmissionSaved', {}).get('co2', 0)
 trees = round(co2 / (12940 / 386)) if co2 > 0 else 0
 
@@ -128,85 +339,101 @@ def_year = today.year
 start_date = st.date_input("Start Date", value=datetime(def_year, 1, 1).date())
 end_date = st.date_input("End Date", value=today)
 
-# Fetch data if requested
+# Fetch data if requested; the frame is kept in session state so that
+# widget changes below re-render from cache instead of refetching
 if st.button("Fetch Data"):
     with st.spinner("Fetching and processing data..."):
-        df = fetch_energy_chunked("QUARTER_OF_AN_HOUR", start_date, end_date)
-
-    if df.empty:
-        st.warning("No data found.")
-    else:
-        st.success("Data loaded successfully!")
-
-        # Display KPI
-        total_energy = df['value'].sum() / unit_factor
-        st.metric(f"Total Energy ({unit_label})", f"{total_energy:,.2f}")
-        max_power = df['value'].max() / 0.25
-        peak_row = df[df['value'] == df['value'].max()].iloc[0]
-        st.metric("Max Power (W)", f"{max_power:,.0f}")
-        st.markdown(f"**Timestamp of Max Power:** {peak_row['datetime']}")
-
-        # Daily total chart
-        st.subheader("Daily Energy Production")
-        daily_df = df.groupby("date")["value"].sum().reset_index()
-        daily_df["value"] = (daily_df["value"] / unit_factor).round(2)
-        fig = px.bar(daily_df, x="date", y="value", labels={"value": unit_label}, title="Daily Total Energy")
-        st.plotly_chart(fig, use_container_width=True)
-
-        # Daily max power
-        st.subheader("Daily Peak Power (W)")
-        daily_peak = df.groupby("date")["value"].max().reset_index()
-        daily_peak["max_power"] = (daily_peak["value"] / 0.25).round()
-        fig_peak = px.line(daily_peak, x="date", y="max_power", title="Daily Peak Power")
-        st.plotly_chart(fig_peak, use_container_width=True)
-
-        # Hourly profile
-        st.subheader("Average Hourly Production")
-        avg_hour = df.groupby("hour_rounded")["value"].mean().reset_index()
-        avg_hour["value"] = (avg_hour["value"] / unit_factor).round(2)
-        fig2 = px.line(avg_hour, x="hour_rounded", y="value", markers=True,
-                      labels={"hour_rounded": "Hour", "value": f"Avg {unit_label}"})
-        st.plotly_chart(fig2, use_container_width=True)
-
-        # Avg vs Peak per Month
-        st.subheader("Monthly Avg vs Peak Power")
-        monthly = df.groupby(["year", "month"])
-        monthly_avg = monthly["value"].mean().reset_index(name="avg_wh")
-        monthly_peak = monthly["value"].max().reset_index(name="peak_wh")
-        monthly_power = pd.merge(monthly_avg, monthly_peak, on=["year", "month"])
-        monthly_power["avg_w"] = (monthly_power["avg_wh"] / 0.25).round()
-        monthly_power["peak_w"] = (monthly_power["peak_wh"] / 0.25).round()
-        monthly_power["label"] = monthly_power["year"].astype(str) + "-" + monthly_power["month"].astype(str).str.zfill(2)
-
-        fig_month = px.bar(monthly_power, x="label", y=["avg_w", "peak_w"], barmode="group",
-                           labels={"value": "Watts", "label": "Month"},
-                           title="Monthly Average vs Peak Power (W)")
-        st.plotly_chart(fig_month, use_container_width=True)
-
-        # Filter heatmap
-        st.subheader("Heatmap: Hour vs Day")
-        year_option = st.selectbox("Filter by Year (optional)", options=["All"] + sorted(df["year"].unique().tolist()))
-        if year_option != "All":
-            df = df[df["year"] == int(year_option)]
-
-        pivot = df.pivot_table(index="hour_rounded", columns="date", values="value", aggfunc="mean").fillna(0)
-        pivot = pivot.loc[~(pivot == 0).all(axis=1)] / unit_factor
-
-        # Annotate peak hour as power not energy
-        peak_idx = df[df['value'] == df['value'].max()].iloc[0]
-        peak_power_kw = (peak_idx['value'] / 0.25) / 1000
-        st.markdown(f"**Peak Power:** {peak_idx['datetime']} — {peak_power_kw:.2f} kW")
-
-        fig, ax = plt.subplots(figsize=(15, 6))
-        sns.heatmap(pivot.round(2), cmap="YlOrRd", ax=ax, cbar_kws={"label": unit_label}, yticklabels=True)
-        ax.set_title("Energy Heatmap (Hour vs Day)")
-        ax.invert_yaxis()
-        st.pyplot(fig)
-
-        # Download heatmap as image
-        buf = io.BytesIO()
-        fig.savefig(buf, format="png")
-        st.download_button("Download Heatmap as PNG", data=buf.getvalue(), file_name="heatmap.png", mime="image/png")
-
-        # Download CSV
-        st.download_button("Download CSV", data=df.to_csv(index=False), file_name="solaredge_data.csv")
+        try:
+            st.session_state["df"] = fetch_energy_chunked("QUARTER_OF_AN_HOUR", start_date, end_date,
+                                                          SITE_ID, API_KEY)
+        except httpx.HTTPStatusError as e:
+            st.error(f"SolarEdge rejected the API Key or Site ID (HTTP {e.response.status_code}).")
+            st.stop()
+        # Bumped on every fetch so state derived from df can tell refetches apart
+        st.session_state["fetch_id"] = st.session_state.get("fetch_id", 0) + 1
+
+df = st.session_state.get("df")
+if df is None:
+    st.stop()
+
+if df.empty:
+    st.warning("No data found.")
+else:
+    st.success("Data loaded successfully!")
+
+    # Display KPI
+    # All KPI reductions run over one float32 view of the value column
+    vals = df["value"].to_numpy(np.float32, copy=False)
+    total_energy = vals.sum(dtype=np.float64) / unit_factor
+    st.metric(f"Total Energy ({unit_label})", f"{total_energy:,.2f}")
+    peak_i = int(vals.argmax())
+    peak_val = float(vals[peak_i])
+    peak_row = df.iloc[peak_i]
+    max_power = peak_val * WH_PER_QH_TO_W
+    st.metric("Max Power (W)", f"{max_power:,.0f}")
+    st.markdown(f"**Timestamp of Max Power:** {peak_row['datetime']}")
+
+    # Daily total chart
+    st.subheader("Daily Energy Production")
+    daily_stats = compute_daily_stats(df)
+    daily_stats["value"] = (daily_stats["total"] / unit_factor).round(2)
+    fig = px.bar(daily_stats, x="date", y="value", labels={"value": unit_label}, title="Daily Total Energy")
+    st.plotly_chart(fig, use_container_width=True)
+
+    # Daily max power
+    st.subheader("Daily Peak Power (W)")
+    fig_peak = px.line(daily_stats, x="date", y="max_power", title="Daily Peak Power")
+    st.plotly_chart(fig_peak, use_container_width=True)
+
+    # Hourly profile
+    st.subheader("Average Hourly Production")
+    avg_hour = compute_avg_hour(df)
+    avg_hour["value"] = (avg_hour["value"] / unit_factor).round(2)
+    fig2 = px.line(avg_hour, x="hour_rounded", y="value", markers=True,
+                  labels={"hour_rounded": "Hour", "value": f"Avg {unit_label}"})
+    st.plotly_chart(fig2, use_container_width=True)
+
+    # Avg vs Peak per Month
+    st.subheader("Monthly Avg vs Peak Power")
+    monthly_power = compute_monthly_power(df)
+
+    fig_month = px.bar(monthly_power, x="label", y=["avg_w", "peak_w"], barmode="group",
+                       labels={"value": "Watts", "label": "Month"},
+                       title="Monthly Average vs Peak Power (W)")
+    st.plotly_chart(fig_month, use_container_width=True)
+
+    # Filter heatmap
+    st.subheader("Heatmap: Hour vs Day")
+    year_option = st.selectbox("Filter by Year (optional)", options=["All"] + sorted(df["year"].unique().tolist()))
+    df_view = df
+    if year_option != "All":
+        df_view = partition_by_year(df)[int(year_option)]
+        view_vals = df_view["value"].to_numpy(np.float32, copy=False)
+        peak_i = int(view_vals.argmax())
+        peak_val = float(view_vals[peak_i])
+        peak_row = df_view.iloc[peak_i]
+
+    # The unit-independent grid is kept across reruns and only rebuilt when the
+    # data is refetched or the year filter changes; unit toggles just rescale it
+    pivot_key = (st.session_state["fetch_id"], year_option)
+    if st.session_state.get("pivot_key") != pivot_key:
+        st.session_state["pivot"] = compute_heatmap_pivot(df_view)
+        st.session_state["pivot_key"] = pivot_key
+    grid, hours, days = st.session_state["pivot"]
+    pivot_vals = grid / unit_factor
+
+    # Annotate peak hour as power not energy
+    peak_power_kw = (peak_val * WH_PER_QH_TO_W) / 1000
+    st.markdown(f"**Peak Power:** {peak_row['datetime']} — {peak_power_kw:.2f} kW")
+
+    fig_heat = go.Figure(go.Heatmap(z=pivot_vals.round(2), x=days, y=hours,
+                                    colorscale="YlOrRd", colorbar={"title": unit_label}))
+    fig_heat.update_layout(title="Energy Heatmap (Hour vs Day)", xaxis_title="Date", yaxis_title="Hour")
+    # PNG export is handled client-side by the chart's mode bar
+    st.plotly_chart(fig_heat, use_container_width=True,
+                    config={"toImageButtonOptions": {"format": "png", "filename": "heatmap"}})
+
+    # Download data
+    st.download_button("Download Parquet", data=to_parquet_bytes(df_view), file_name="solaredge_data.parquet",
+                       mime="application/octet-stream")
+    st.download_button("Download CSV", data=to_csv_bytes(df_view), file_name="solaredge_data.csv")